@@ -1,14 +1,34 @@
-import feedparser
 import openai
 import requests
 import tempfile
+import contextlib
+import io
+import itertools
+import logging
 import os
-from flask import Flask, request, render_template, send_file
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import Flask, Response, request, render_template, send_file, jsonify, stream_with_context, url_for
 from dotenv import load_dotenv
+import metrics
+from metrics import span
+from feed_cache import FeedCache, download_feed
+from summary_cache import SummaryCache, article_id, make_key, word_bucket
+from articles import prepare_articles
+from audio import AudioCache, iter_audio_frames, rechunk, segment_key
+from briefings import BriefingScheduler, BriefingStore, feed_fingerprint, normalize_params, params_key
+from jobs import JobManager, JobQueueFull
 
 app = Flask(__name__)
 load_dotenv()
 
+# Logging replaces the former prints. LOG_LEVEL=WARNING hides the per-stage
+# timing lines, METRICS_ENABLED=0 switches off the timing spans altogether.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+metrics.configure(LOG_LEVEL, METRICS_ENABLED)
+logger = logging.getLogger(__name__)
+
 # Define categories and their associated RSS feeds
 CATEGORIES = {
     "Nachrichten": "https://taz.de/!p4608;rss/",
@@ -23,36 +43,240 @@ CATEGORIES = {
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 ELEVENLABS_API_KEY = os.getenv('ELEVENLABS_API_KEY')
 
+# Concurrency limit and timeout (seconds) of the fetch and summarize stages;
+# categories not finished CATEGORY_TIMEOUT seconds after a stage started are dropped
+CATEGORY_WORKERS = int(os.getenv('CATEGORY_WORKERS', 4))
+CATEGORY_TIMEOUT = float(os.getenv('CATEGORY_TIMEOUT', 60))
+
+# Feed cache: entries are fresh for FEED_CACHE_TTL seconds and served stale for
+# FEED_CACHE_STALE_TTL more seconds while they are refreshed in the background.
+# FEED_REFRESH_INTERVAL > 0 keeps all CATEGORIES feeds warm from a background thread.
+# FEED_TIMEOUT bounds the connect and read time of every feed download; a failed
+# download is retried after FEED_CACHE_NEGATIVE_TTL seconds.
+FEED_CACHE_TTL = float(os.getenv('FEED_CACHE_TTL', 300))
+FEED_CACHE_STALE_TTL = float(os.getenv('FEED_CACHE_STALE_TTL', 3600))
+FEED_CACHE_SIZE = int(os.getenv('FEED_CACHE_SIZE', 32))
+FEED_CACHE_NEGATIVE_TTL = float(os.getenv('FEED_CACHE_NEGATIVE_TTL', 30))
+FEED_REFRESH_INTERVAL = float(os.getenv('FEED_REFRESH_INTERVAL', 0))
+FEED_TIMEOUT = float(os.getenv('FEED_TIMEOUT', 15))
+
+feed_cache = FeedCache(
+    ttl=FEED_CACHE_TTL,
+    stale_ttl=FEED_CACHE_STALE_TTL,
+    max_size=FEED_CACHE_SIZE,
+    negative_ttl=FEED_CACHE_NEGATIVE_TTL,
+    parse=lambda url, **kwargs: download_feed(url, timeout=FEED_TIMEOUT, **kwargs)
+)
+if FEED_REFRESH_INTERVAL > 0:
+    feed_cache.start_refresher(CATEGORIES.values(), FEED_REFRESH_INTERVAL)
+
+# Text to speech: every category is synthesized as its own segment, TTS_WORKERS
+# at a time. TTS_STREAMING pipes the audio to the client as soon as the first
+# segment arrives instead of waiting for the whole file.
+ELEVENLABS_API_URL = os.getenv('ELEVENLABS_API_URL', 'https://api.elevenlabs.io').rstrip('/')
+TTS_VOICE_ID = "iMHt6G42evkXunaDU065"
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.8,
+    "style": 0.2,
+    "use_speaker_boost": True
+}
+TTS_STREAMING = os.getenv('TTS_STREAMING', '1') == '1'
+TTS_CHUNK_SIZE = int(os.getenv('TTS_CHUNK_SIZE', 16 * 1024))
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', 120))
+TTS_WORKERS = int(os.getenv('TTS_WORKERS', 4))
+AUDIO_FILENAME = "nachrichten.mp3"
+
+# Synthesized segments are cached on disk by text, voice, model and settings
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'customnews-audio')
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+audio_cache = AudioCache(AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES)
+
+# Pre-generated briefings: request counts and finished MP3s live in BRIEFING_DIR.
+# The scheduler regenerates the BRIEFING_TOP_N most requested combinations of
+# the last BRIEFING_WINDOW seconds when their feed entries changed. It runs in
+# this process with BRIEFING_SCHEDULER=1.
+BRIEFING_DIR = os.getenv('BRIEFING_DIR') or os.path.join(tempfile.gettempdir(), 'customnews-briefings')
+BRIEFING_WINDOW = float(os.getenv('BRIEFING_WINDOW', 24 * 3600))
+BRIEFING_TOP_N = int(os.getenv('BRIEFING_TOP_N', 5))
+BRIEFING_INTERVAL = float(os.getenv('BRIEFING_INTERVAL', 300))
+BRIEFING_SCHEDULER = os.getenv('BRIEFING_SCHEDULER', '0') == '1'
+
+briefing_store = BriefingStore(BRIEFING_DIR, window=BRIEFING_WINDOW)
+
+# Job API: briefings requested through /jobs run on JOB_WORKERS threads behind
+# a queue of JOB_QUEUE_SIZE jobs; results are kept for JOB_RESULT_TTL seconds
+JOB_DIR = os.getenv('JOB_DIR') or os.path.join(tempfile.gettempdir(), 'customnews-jobs')
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_QUEUE_SIZE = int(os.getenv('JOB_QUEUE_SIZE', 10))
+JOB_RESULT_TTL = float(os.getenv('JOB_RESULT_TTL', 3600))
+JOB_RETRY_AFTER = 10
+
+SUMMARY_MODEL = "gpt-4"
+SUMMARY_PROMPT = "Fasse den folgenden Text in etwa {word_count} Wörtern zusammen."
+
+# Article preparation: ARTICLE_CANDIDATE_FACTOR times the needed articles are
+# fetched so duplicates (MinHash similarity >= ARTICLE_DUPLICATE_THRESHOLD) can
+# be replaced. The prompt input of a category is limited to
+# SUMMARY_INPUT_TOKENS_PER_WORD tokens per summary word, at most SUMMARY_MAX_INPUT_TOKENS.
+ARTICLE_CANDIDATE_FACTOR = int(os.getenv('ARTICLE_CANDIDATE_FACTOR', 2))
+ARTICLE_DUPLICATE_THRESHOLD = float(os.getenv('ARTICLE_DUPLICATE_THRESHOLD', 0.6))
+SUMMARY_INPUT_TOKENS_PER_WORD = float(os.getenv('SUMMARY_INPUT_TOKENS_PER_WORD', 8))
+SUMMARY_MAX_INPUT_TOKENS = int(os.getenv('SUMMARY_MAX_INPUT_TOKENS', 6000))
+
+# Summary cache: requested word counts are rounded to SUMMARY_WORD_BUCKET so
+# near-identical requests share entries. SUMMARY_CACHE_DB enables the SQLite
+# store that survives restarts.
+SUMMARY_WORD_BUCKET = int(os.getenv('SUMMARY_WORD_BUCKET', 25))
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', 256))
+SUMMARY_CACHE_MAX_AGE = float(os.getenv('SUMMARY_CACHE_MAX_AGE', 6 * 3600))
+SUMMARY_CACHE_DB = os.getenv('SUMMARY_CACHE_DB') or None
+SUMMARY_CACHE_DB_SIZE = int(os.getenv('SUMMARY_CACHE_DB_SIZE', 5000))
+
+summary_cache = SummaryCache(
+    max_size=SUMMARY_CACHE_SIZE,
+    max_age=SUMMARY_CACHE_MAX_AGE,
+    db_path=SUMMARY_CACHE_DB,
+    db_max_size=SUMMARY_CACHE_DB_SIZE
+)
+
 
 # Function to fetch news feed
 def fetch_news_feed(url):
-    return feedparser.parse(url)
+    with span("fetch_news_feed", url=url) as tags:
+        feed = feed_cache.get(url)
+        tags["entries"] = len(feed.entries)
+        return feed
 
 
 # Function to get the latest articles from the feed
 def get_latest_articles(feed, num_articles=5):
-    return feed.entries[:num_articles]
+    with span("get_latest_articles") as tags:
+        articles = feed.entries[:num_articles]
+        tags["articles"] = len(articles)
+        return articles
 
 
 # Function to summarize articles using OpenAI
 def summarize_articles(articles, openai_client, word_count):
-    text = " ".join([article.summary for article in articles])
-    prompt = f"Fasse den folgenden Text in etwa {word_count} Wörtern zusammen."
-    response = openai_client.chat_completions.create(
-        model="gpt-4",
-        messages=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": text}
-        ]
+    with span("summarize_articles", articles=len(articles)) as tags:
+        word_count = word_bucket(word_count, SUMMARY_WORD_BUCKET)
+        key = make_key([article_id(article) for article in articles], word_count, SUMMARY_MODEL, SUMMARY_PROMPT)
+        summary = summary_cache.get(key)
+        tags["cached"] = summary is not None
+        if summary is not None:
+            return summary
+
+        text = " ".join([article.summary for article in articles])
+        prompt = SUMMARY_PROMPT.format(word_count=word_count)
+        response = openai_client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": text}
+            ]
+        )
+        summary = response.choices[0].message.content.strip()
+        summary_cache.put(key, summary)
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            tags["input_tokens"] = usage.prompt_tokens
+            tags["output_tokens"] = usage.completion_tokens
+            metrics.TOKENS.inc(usage.prompt_tokens, kind="input")
+            metrics.TOKENS.inc(usage.completion_tokens, kind="output")
+        return summary
+
+
+# Function to fetch the latest articles of a single category
+def fetch_category_articles(category, articles_per_category):
+    feed = fetch_news_feed(CATEGORIES[category])
+    return get_latest_articles(feed, articles_per_category)
+
+
+# Function to compute the per-category input token budget for the summary prompt
+def input_token_budget(articles_per_category, words_per_category):
+    budget = int(words_per_category * SUMMARY_INPUT_TOKENS_PER_WORD)
+    return min(SUMMARY_MAX_INPUT_TOKENS, max(budget, articles_per_category * 50))
+
+
+# Function to fetch candidate articles for the selected categories and prepare
+# them for summarizing: markup stripped, duplicate stories removed and packed
+# into the input token budget. Returns the articles per category and the report.
+def select_briefing_articles(selected_categories, articles_per_category, words_per_category, on_done=None):
+    candidates = run_per_category(
+        lambda category: fetch_category_articles(category, articles_per_category * ARTICLE_CANDIDATE_FACTOR),
+        selected_categories,
+        on_done=on_done
     )
-    summary = response.choices[0].message["content"].strip()
-    return summary
+    candidates = {category: candidates.get(category) or [] for category in selected_categories}
+    with span("prepare_articles") as tags:
+        articles, report = prepare_articles(
+            candidates,
+            articles_per_category,
+            input_token_budget(articles_per_category, words_per_category),
+            model=SUMMARY_MODEL,
+            threshold=ARTICLE_DUPLICATE_THRESHOLD
+        )
+        tags.update(report.to_dict())
+    metrics.TOKENS.inc(report.tokens_saved, kind="saved")
+    return articles, report
+
+
+# Function to build a progress callback that reports the share of finished tasks of a stage
+def stage_progress(progress, stage, total):
+    finished = itertools.count(1)
+    progress(stage, 0.0)
+    return lambda *_: progress(stage, next(finished) / max(1, total))
+
+
+# Function to run a task for every category on a bounded thread pool.
+# Returns a dict with the result per category; categories that fail or are not
+# finished `timeout` seconds after the stage started (queued ones included) map to None.
+# on_done(category) is called whenever a category finished, failed or timed out.
+def run_per_category(task, categories, max_workers=CATEGORY_WORKERS, timeout=CATEGORY_TIMEOUT, on_done=None):
+    def run(category):
+        with metrics.tags(category=category):
+            return task(category)
+
+    deadline = time.monotonic() + timeout
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    futures = {category: metrics.submit(executor, run, category) for category in categories}
+    pending = set(futures.values())
+    results = {}
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            expired = not done
+            for category in categories:
+                future = futures[category]
+                if future in done:
+                    try:
+                        results[category] = future.result()
+                    except Exception as e:
+                        logger.warning(f"Fehler in der Kategorie '{category}': {e}")
+                        results[category] = None
+                elif expired and future in pending:
+                    logger.warning(f"Zeitüberschreitung in der Kategorie '{category}' nach {timeout} Sekunden.")
+                    results[category] = None
+                else:
+                    continue
+                if on_done:
+                    on_done(category)
+            if expired:
+                break
+    finally:
+        # Timed out tasks are abandoned, queued ones are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
 
 
-# Function to convert text to speech using ElevenLabs API
-def text_to_speech(text, elevenlabs_api_key):
-    voice_id = "iMHt6G42evkXunaDU065"
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
+# Function to open a streaming text to speech request against the ElevenLabs API
+def request_speech(text, elevenlabs_api_key):
+    url = f"{ELEVENLABS_API_URL}/v1/text-to-speech/{TTS_VOICE_ID}"
     headers = {
         "Accept": "audio/mpeg",
         "Content-Type": "application/json",
@@ -60,27 +284,321 @@ def text_to_speech(text, elevenlabs_api_key):
     }
     data = {
         "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.8,
-            "style": 0.2,
-            "use_speaker_boost": True
-        }
+        "model_id": TTS_MODEL_ID,
+        "voice_settings": TTS_VOICE_SETTINGS
     }
 
-    response = requests.post(url, headers=headers, json=data)
-    response.raise_for_status()
+    with span("request_speech", characters=len(text)):
+        response = requests.post(url, headers=headers, json=data, stream=True, timeout=TTS_TIMEOUT)
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+
+# Function to stream speech: yields the upstream audio/mpeg chunks as they arrive
+def stream_text_to_speech(text, elevenlabs_api_key, chunk_size=None):
+    # The request is sent eagerly so upstream errors surface before the response starts
+    response = request_speech(text, elevenlabs_api_key)
+
+    def chunks():
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size or TTS_CHUNK_SIZE):
+                if chunk:
+                    yield chunk
+        finally:
+            response.close()
+
+    return chunks()
+
+
+# Function to get the audio cache key of a text segment
+def speech_key(text):
+    return segment_key(text, TTS_VOICE_ID, TTS_MODEL_ID, TTS_VOICE_SETTINGS)
+
+
+# Function to read a cached audio segment in chunks
+def read_audio(path, chunk_size=None):
+    with open(path, "rb") as fp:
+        while True:
+            chunk = fp.read(chunk_size or TTS_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# Function to convert text to speech using ElevenLabs API, returns the path of the cached audio segment
+def text_to_speech(text, elevenlabs_api_key, chunk_size=None):
+    with span("text_to_speech", characters=len(text)) as tags:
+        key = speech_key(text)
+        audio_file_path = audio_cache.get(key)
+        tags["cached"] = audio_file_path is not None
+        if audio_file_path is None:
+            audio_file_path = audio_cache.put(key, stream_text_to_speech(text, elevenlabs_api_key, chunk_size))
+            logger.debug(f"Audio file saved at: {audio_file_path}")
+        audio_bytes = os.path.getsize(audio_file_path)
+        tags["audio_bytes"] = audio_bytes
+        metrics.AUDIO_BYTES.inc(audio_bytes, source="cache" if tags["cached"] else "tts")
+        return audio_file_path
+
+
+# Function to synthesize segments in parallel, returns the executor and one future per segment
+def synthesize_segments(segments, progress=None):
+    executor = ThreadPoolExecutor(max_workers=max(1, TTS_WORKERS))
+    futures = [metrics.submit(executor, text_to_speech, segment, ELEVENLABS_API_KEY) for segment in segments]
+    if progress:
+        on_done = stage_progress(progress, "synthesizing", len(futures))
+        for future in futures:
+            future.add_done_callback(on_done)
+    return executor, futures
+
+
+# Function to get the audio frames of finished segments in order, skipping failed ones
+def segment_frames(futures):
+    for future in futures:
+        try:
+            audio_file_path = future.result(timeout=TTS_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Fehler beim Generieren eines Audio-Segments: {e}")
+            continue
+        yield from iter_audio_frames(read_audio(audio_file_path))
+
+
+# Function to stream a segment while it is synthesized (and written to the cache).
+# Like segment_frames, a failed segment is logged and skipped.
+def stream_segment(text):
+    try:
+        with span("text_to_speech", characters=len(text), streamed=True) as tags:
+            key = speech_key(text)
+            audio_file_path = audio_cache.get(key)
+            tags["cached"] = audio_file_path is not None
+            if audio_file_path is not None:
+                chunks = read_audio(audio_file_path)
+            else:
+                chunks = audio_cache.store(key, stream_text_to_speech(text, ELEVENLABS_API_KEY))
+            audio_bytes = 0
+            for chunk in chunks:
+                audio_bytes += len(chunk)
+                yield chunk
+            tags["audio_bytes"] = audio_bytes
+            metrics.AUDIO_BYTES.inc(audio_bytes, source="cache" if tags["cached"] else "tts")
+    except Exception as e:
+        logger.warning(f"Fehler beim Generieren eines Audio-Segments: {e}")
+
+
+# Function to stream the concatenated segments. The first segment is passed
+# through while it is synthesized, the others are synthesized in parallel
+# meanwhile. Raises before the response starts if no segment produced any audio.
+def stream_segments(segments):
+    executor, futures = synthesize_segments(segments[1:])
+
+    def chunks():
+        try:
+            frames = itertools.chain(iter_audio_frames(stream_segment(segments[0])), segment_frames(futures))
+            yield from rechunk(frames, TTS_CHUNK_SIZE)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    stream = chunks()
+    first = next(stream, None)
+    if first is None:
+        raise requests.RequestException("Kein Audio-Segment konnte generiert werden")
+
+    def response_chunks():
+        with contextlib.closing(stream):
+            yield first
+            yield from stream
+
+    return response_chunks()
+
+
+# Function to synthesize the segments and join them into one MP3 in memory
+def render_audio(segments, progress=None):
+    executor, futures = synthesize_segments(segments, progress)
+    try:
+        audio = b"".join(segment_frames(futures))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    if not audio:
+        raise requests.RequestException("Kein Audio-Segment konnte generiert werden")
+    return audio
+
+
+# Function to build the audio response for the text segments in order,
+# streamed or as one concatenated MP3 held in memory
+def audio_response(segments):
+    if TTS_STREAMING:
+        return Response(
+            stream_with_context(stream_segments(segments)),
+            mimetype="audio/mpeg",
+            headers={"Content-Disposition": f"attachment; filename={AUDIO_FILENAME}"}
+        )
+
+    audio = render_audio(segments)
+    return send_file(io.BytesIO(audio), mimetype="audio/mpeg", as_attachment=True, download_name=AUDIO_FILENAME)
+
 
-    # Save audio content to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-        for chunk in response.iter_content(chunk_size=1024):
-            if chunk:
-                fp.write(chunk)
-        audio_file_path = fp.name
+# Function to compute how many articles and words every category gets
+def briefing_plan(selected_categories, total_time, detail_level):
+    time_per_category = total_time / len(selected_categories)
+    words_per_second = 2.5  # Approximation: 150 words per minute / 60 seconds
+    words_per_minute = words_per_second * 60
+    words_per_article = detail_level * 5 * words_per_second
+    words_per_category = time_per_category * words_per_minute
+    articles_per_category = max(1, int(words_per_category / words_per_article))
+    return articles_per_category, words_per_category
 
-    print(f"Audio file saved at: {audio_file_path}")
-    return audio_file_path
+
+# Function to summarize the selected categories, returns one text segment per category in order.
+# progress(stage, fraction) is called as the fetching and summarizing stages advance.
+# Articles already selected for the briefing (see briefing_articles) are not fetched again.
+def summarize_briefing(selected_categories, total_time, detail_level, progress=None, articles=None):
+    articles_per_category, words_per_category = briefing_plan(selected_categories, total_time, detail_level)
+    logger.info(f"Berechne Artikel pro Kategorie: {articles_per_category} pro Kategorie")
+    progress = progress or (lambda stage, fraction: None)
+
+    if articles is None:
+        articles, _ = select_briefing_articles(
+            selected_categories,
+            articles_per_category,
+            words_per_category,
+            on_done=stage_progress(progress, "fetching", len(selected_categories))
+        )
+    else:
+        progress("fetching", 1.0)
+    found_categories = []
+    for category in selected_categories:
+        if not articles.get(category):
+            logger.info(f"Keine Artikel gefunden für die Kategorie '{category}'.")
+            continue
+        found_categories.append(category)
+
+    all_summaries = []
+    openai_client = openai.OpenAI(api_key=OPENAI_API_KEY, timeout=CATEGORY_TIMEOUT)
+    summaries = run_per_category(
+        lambda category: summarize_articles(articles[category], openai_client, int(words_per_category)),
+        found_categories,
+        on_done=stage_progress(progress, "summarizing", len(found_categories))
+    )
+    for category in found_categories:
+        summary = summaries.get(category)
+        if not summary:
+            continue
+
+        all_summaries.append(f"{category}: \n{summary}")
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Zusammenfassung der Nachrichten:\n" + "\n\n".join(all_summaries))
+    return all_summaries
+
+
+# Function to select the articles a briefing would be built from right now
+def briefing_articles(params):
+    selected_categories, total_time, detail_level = params
+    articles_per_category, words_per_category = briefing_plan(selected_categories, total_time, detail_level)
+    articles, _ = select_briefing_articles(selected_categories, articles_per_category, words_per_category)
+    return articles
+
+
+# Function to fingerprint the articles selected for a briefing
+def articles_fingerprint(articles):
+    article_ids = {
+        category: [article_id(article) for article in category_articles]
+        for category, category_articles in articles.items()
+    }
+    return feed_fingerprint(article_ids)
+
+
+# Function to fingerprint the feed entries a briefing would be built from right now
+def briefing_fingerprint(params):
+    return articles_fingerprint(briefing_articles(params))
+
+
+# Function to generate the finished MP3 of a briefing, None if there is nothing to say
+def generate_briefing(params, progress=None, articles=None):
+    selected_categories, total_time, detail_level = params
+    all_summaries = summarize_briefing(selected_categories, total_time, detail_level, progress, articles)
+    if not all_summaries:
+        return None
+    return render_audio(all_summaries, progress)
+
+
+# Function to pre-generate a briefing from the scheduler, each run gets its own request id
+def pregenerate_briefing(params):
+    metrics.new_request_id()
+    return generate_briefing(params)
+
+
+# Function to look up a pre-generated briefing that is still up to date with the feeds.
+# Returns its path (or None) and the articles selected to compare the fingerprints,
+# None if no briefing is stored for the params and the feeds were not fetched.
+def stored_briefing(params):
+    selection = {}
+
+    def current_fingerprint():
+        selection["articles"] = briefing_articles(params)
+        return articles_fingerprint(selection["articles"])
+
+    try:
+        audio_file_path = briefing_store.get(params, current_fingerprint)
+    except Exception as e:
+        logger.warning(f"Vorberechnetes Briefing nicht verfügbar: {e}")
+        audio_file_path = None
+    return audio_file_path, selection.get("articles")
+
+
+# Function to run a briefing job, answered from the pre-generated briefings when possible
+def run_briefing_job(params, progress):
+    audio_file_path, articles = stored_briefing(params)
+    if audio_file_path:
+        with open(audio_file_path, "rb") as fp:
+            return fp.read()
+    return generate_briefing(params, progress, articles)
+
+
+# Function to read and validate the briefing parameters of a request
+def briefing_params(values):
+    if hasattr(values, "getlist"):
+        categories = values.getlist("categories")
+    else:
+        categories = values.get("categories") or []
+    try:
+        total_time = int(values.get("total_time"))
+        detail_level = int(values.get("detail_level"))
+    except (TypeError, ValueError):
+        raise ValueError("total_time und detail_level müssen Zahlen sein")
+    params = normalize_params(categories, total_time, detail_level, CATEGORIES)
+    if not params[0]:
+        raise ValueError("Keine gültige Kategorie ausgewählt")
+    if total_time <= 0 or not 1 <= detail_level <= 5:
+        raise ValueError("total_time muss positiv und detail_level zwischen 1 und 5 sein")
+    return params
+
+
+@app.before_request
+def start_request():
+    metrics.new_request_id(request.headers.get("X-Request-ID"))
+    request.started_at = time.perf_counter()
+    request.in_flight = True
+    metrics.HTTP_IN_FLIGHT.inc(endpoint=request.endpoint)
+
+
+@app.after_request
+def finish_request(response):
+    response.headers["X-Request-ID"] = metrics.get_request_id()
+    metrics.HTTP_SECONDS.observe(
+        time.perf_counter() - request.started_at, endpoint=request.endpoint, status=response.status_code)
+    return response
+
+
+@app.teardown_request
+def teardown_request(exception=None):
+    # Streamed responses tear down the request context a second time
+    if getattr(request, "in_flight", False):
+        request.in_flight = False
+        metrics.HTTP_IN_FLIGHT.dec(endpoint=request.endpoint)
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -90,42 +608,119 @@ def main():
         total_time = int(request.form['total_time'])
         detail_level = int(request.form['detail_level'])
 
-        time_per_category = total_time / len(selected_categories)
-        words_per_second = 2.5  # Approximation: 150 words per minute / 60 seconds
-        words_per_minute = words_per_second * 60
-        words_per_article = detail_level * 5 * words_per_second
-        words_per_category = time_per_category * words_per_minute
-        articles_per_category = max(1, int(words_per_category / words_per_article))
-
-        print(f"Berechne Artikel pro Kategorie: {articles_per_category} pro Kategorie")
-
-        all_summaries = []
-        openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        for category in selected_categories:
-            feed_url = CATEGORIES[category]
-            feed = fetch_news_feed(feed_url)
-            articles = get_latest_articles(feed, articles_per_category)
-            if not articles:
-                print(f"Keine Artikel gefunden für die Kategorie '{category}'.")
-                continue
-
-            summary = summarize_articles(articles, openai_client, int(words_per_category))
-            all_summaries.append(f"{category}: \n{summary}")
-
-        final_summary = "\n\n".join(all_summaries)
-        print("Zusammenfassung der Nachrichten:")
-        print(final_summary)
-
-        audio_file_path = text_to_speech(final_summary, ELEVENLABS_API_KEY)
-        if audio_file_path:
-            print(f"Audio wird abgespielt von: {audio_file_path}")
-            return send_file(audio_file_path, as_attachment=True)
-        else:
-            print("Fehler beim Generieren des Audios")
+        params = normalize_params(selected_categories, total_time, detail_level, CATEGORIES)
+        articles = None
+        if params[0]:
+            briefing_store.record_request(params)
+            audio_file_path, articles = stored_briefing(params)
+            if audio_file_path:
+                logger.info(f"Vorberechnetes Briefing: {audio_file_path}")
+                return send_file(audio_file_path, mimetype="audio/mpeg", as_attachment=True,
+                                 download_name=AUDIO_FILENAME)
+            # The articles were selected in CATEGORIES order, summarize in the same order
+            selected_categories = list(params[0])
+
+        all_summaries = summarize_briefing(selected_categories, total_time, detail_level, articles=articles)
+        if not all_summaries:
+            logger.warning("Keine Zusammenfassungen vorhanden")
+            return "Fehler beim Generieren des Audios", 500
+
+        try:
+            return audio_response(all_summaries)
+        except requests.RequestException as e:
+            logger.error(f"Fehler beim Generieren des Audios: {e}")
             return "Fehler beim Generieren des Audios", 500
 
     return render_template('index.html', categories=CATEGORIES)
 
 
+briefing_scheduler = BriefingScheduler(
+    briefing_store,
+    pregenerate_briefing,
+    briefing_fingerprint,
+    top_n=BRIEFING_TOP_N,
+    interval=BRIEFING_INTERVAL
+)
+if BRIEFING_SCHEDULER:
+    briefing_scheduler.start()
+
+
+job_manager = JobManager(
+    run_briefing_job,
+    JOB_DIR,
+    workers=JOB_WORKERS,
+    max_queue=JOB_QUEUE_SIZE,
+    result_ttl=JOB_RESULT_TTL
+)
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    try:
+        params = briefing_params(request.get_json(silent=True) or request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    briefing_store.record_request(params)
+    try:
+        job, created = job_manager.submit(params_key(params), params)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429, {"Retry-After": str(JOB_RETRY_AFTER)}
+
+    body = job.to_dict()
+    body["status_url"] = url_for("job_status", job_id=job.id)
+    body["audio_url"] = url_for("job_audio", job_id=job.id)
+    return jsonify(body), 202 if created else 200, {"Location": body["status_url"]}
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/audio')
+def job_audio(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    if job.stage != "done":
+        return jsonify(job.to_dict()), 409
+    return send_file(job.audio_path, mimetype="audio/mpeg", as_attachment=True, download_name=AUDIO_FILENAME)
+
+
+# Function to collect the statistics of all caches and the job queue
+def cache_statistics():
+    return {
+        "feeds": feed_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "audio": audio_cache.stats(),
+        "briefings": briefing_store.stats(),
+        "jobs": job_manager.stats()
+    }
+
+
+@metrics.registry.collector
+def cache_metrics():
+    values = {}
+    for cache, stats in cache_statistics().items():
+        for name, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values[(cache, name)] = value
+    return "customnews_cache", "Cache and job queue statistics, see /cache/stats.", ("cache", "stat"), values
+
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(cache_statistics())
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(debug=True)
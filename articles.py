@@ -0,0 +1,185 @@
+import hashlib
+import html
+import math
+import re
+import time
+from html.parser import HTMLParser
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Rough token estimate for German news text when tiktoken is not installed
+CHARS_PER_TOKEN = 3.5
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in ("p", "br", "div", "li"):
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+# Function to turn a feed summary into plain text
+def strip_markup(text):
+    if "<" in text:
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        extractor.close()
+        text = "".join(extractor.parts)
+    return _WHITESPACE.sub(" ", html.unescape(text)).strip()
+
+
+_encodings = {}
+
+
+# Function to count the tokens of a text for the given model
+def count_tokens(text, model="gpt-4"):
+    if tiktoken is not None:
+        encoding = _encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+            _encodings[model] = encoding
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# Function to cut a text down to about max_tokens tokens at a word boundary
+def truncate_tokens(text, max_tokens, model="gpt-4"):
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    words = text.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle]) + " …", model) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low]) + " …" if low else ""
+
+
+# MinHash signature over word shingles, used to find near-identical stories
+def minhash(text, num_perm=64, shingle_size=3):
+    words = [word.lower() for word in _WORD.findall(text)]
+    if len(words) < shingle_size:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "big")
+              for shingle in shingles]
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS[:num_perm]]
+
+
+def _permutations(count):
+    permutations = []
+    for i in range(count):
+        digest = hashlib.sha256(f"minhash-{i}".encode("ascii")).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:16], "big") % _MERSENNE_PRIME
+        permutations.append((a, b))
+    return permutations
+
+
+_PERMUTATIONS = _permutations(128)
+
+
+# Estimated Jaccard similarity of two MinHash signatures
+def similarity(signature, other):
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def _published(article):
+    published = article.get("published_parsed") or article.get("updated_parsed")
+    return time.mktime(published) if published else 0.0
+
+
+# Per-request result of prepare_articles
+class PreparationReport:
+    def __init__(self):
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.duplicates = 0
+        self.truncated = 0
+
+    @property
+    def tokens_saved(self):
+        return max(0, self.tokens_before - self.tokens_after)
+
+    def to_dict(self):
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_saved,
+            "duplicates": self.duplicates,
+            "truncated": self.truncated,
+        }
+
+
+# Function to prepare the candidate articles of every category for summarizing.
+# Markup is stripped, stories that are near-identical to an already selected
+# one (newer ones within a category, earlier categories across categories)
+# are dropped, and the newest remaining articles are
+# packed into `token_budget` tokens, at most `max_articles` per category.
+# `tokens_before` in the report is what the first `max_articles` raw entries
+# would have cost. Returns the prepared articles per category and the report.
+def prepare_articles(candidates, max_articles, token_budget, model="gpt-4", threshold=0.6):
+    report = PreparationReport()
+    prepared = {}
+    seen = []
+    for category, articles in candidates.items():
+        report.tokens_before += sum(
+            count_tokens(article.get("summary", ""), model) for article in articles[:max_articles])
+
+        selected = []
+        budget = token_budget
+        per_article = max(1, token_budget // max(1, max_articles))
+        for article in sorted(articles, key=_published, reverse=True):
+            if len(selected) >= max_articles or budget <= 0:
+                break
+            text = strip_markup(article.get("summary", "") or article.get("title", ""))
+            if not text:
+                continue
+            signature = minhash(text)
+            if any(similarity(signature, other) >= threshold for other in seen):
+                report.duplicates += 1
+                continue
+            seen.append(signature)
+
+            limited = truncate_tokens(text, min(per_article, budget), model)
+            if limited != text:
+                report.truncated += 1
+            if not limited:
+                continue
+            tokens = count_tokens(limited, model)
+            budget -= tokens
+            report.tokens_after += tokens
+
+            article = type(article)(article)
+            article["summary"] = limited
+            selected.append(article)
+        prepared[category] = selected
+    return prepared, report
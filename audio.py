@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+# Bitrates in kbit/s by (MPEG version 1?, layer)
+_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by MPEG version bits (0 = 2.5, 2 = 2, 3 = 1)
+_SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+
+
+# Function to get the length of the MP3 frame starting with the 4 byte header, None if it is no valid header
+def frame_length(header):
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version == 3
+    bitrate = _BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding
+    return 144 * bitrate // sample_rate + padding
+
+
+# Xing/Info/VBRI frames carry the length of a single file and are wrong after concatenation
+def is_info_frame(frame):
+    head = frame[:64]
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+
+# Function to split MP3 data arriving in chunks into its audio frames.
+# ID3v2 tags, info frames and anything between frames (e.g. ID3v1 tags) are
+# dropped, so the frames of several files can be concatenated without re-encoding.
+def iter_audio_frames(chunks):
+    buffer = bytearray()
+    at_start = True
+    for chunk in chunks:
+        buffer += chunk
+        position = 0
+        while True:
+            if at_start and len(buffer) - position < 10 and b"ID3".startswith(bytes(buffer[position:position + 3])):
+                # Could be the start of an ID3 tag, wait for its complete header
+                break
+            if at_start and len(buffer) - position >= 10 and buffer[position:position + 3] == b"ID3":
+                size = ((buffer[position + 6] & 0x7F) << 21 | (buffer[position + 7] & 0x7F) << 14
+                        | (buffer[position + 8] & 0x7F) << 7 | (buffer[position + 9] & 0x7F))
+                footer = 10 if buffer[position + 5] & 0x10 else 0
+                if len(buffer) - position < 10 + size + footer:
+                    break
+                position += 10 + size + footer
+                continue
+            if len(buffer) - position < 4:
+                break
+            length = frame_length(buffer[position:position + 4])
+            if length is None:
+                position += 1
+                continue
+            if len(buffer) - position < length:
+                break
+            frame = bytes(buffer[position:position + length])
+            position += length
+            if at_start and is_info_frame(frame):
+                at_start = False
+                continue
+            at_start = False
+            yield frame
+        del buffer[:position]
+
+
+# Function to regroup small pieces (e.g. single frames) into chunks of at least `size` bytes
+def rechunk(chunks, size):
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+# Cache key of a synthesized text segment
+def segment_key(text, voice_id, model_id, voice_settings):
+    payload = json.dumps(
+        {"text": text, "voice_id": voice_id, "model_id": model_id, "voice_settings": voice_settings},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# On-disk cache for synthesized audio segments, evicting the least recently
+# used files once the directory grows beyond `max_bytes`
+class AudioCache:
+    def __init__(self, directory, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    # Return the path of the cached segment or None
+    def get(self, key):
+        path = self.path(key)
+        try:
+            # The modification time doubles as last access time for the LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return path
+
+    # Write the chunks to the cache while passing them on. The file only
+    # becomes visible once all chunks were written.
+    def store(self, key, chunks):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                for chunk in chunks:
+                    fp.write(chunk)
+                    yield chunk
+            os.replace(temp_path, self.path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self._count("stores")
+        self.evict()
+
+    # Store all chunks and return the path of the cached segment
+    def put(self, key, chunks):
+        for _ in self.store(key, chunks):
+            pass
+        return self.path(key)
+
+    def _files(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".mp3"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def evict(self):
+        with self._lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        files = self._files()
+        with self._lock:
+            stats = dict(self._stats)
+        stats["files"] = len(files)
+        stats["bytes"] = sum(size for _, size, _ in files)
+        stats["max_bytes"] = self.max_bytes
+        return stats
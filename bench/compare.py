@@ -0,0 +1,48 @@
+import argparse
+import json
+
+
+# Compare two bench.run results, e.g. before and after a change:
+#   python -m bench.compare bench/results/old.json bench/results/new.json
+def rows(result):
+    yield "throughput (req/s)", result.get("throughput")
+    yield "errors", result.get("errors")
+    for name in ("p50", "p95", "p99", "mean"):
+        yield f"latency {name} (s)", result["latency"].get(name)
+    for name in ("p50", "p95"):
+        yield f"ttfb {name} (s)", result["ttfb"].get(name)
+    yield "peak RSS (MiB)", (result.get("peak_rss_bytes") or 0) / 2 ** 20
+    for stage, disk in sorted(result.get("disk_bytes", {}).items()):
+        yield f"disk {stage} peak (MiB)", disk["peak"] / 2 ** 20
+    for stage, values in sorted(result.get("stages", {}).items()):
+        yield f"{stage} p50 (s)", values.get("p50")
+        yield f"{stage} p95 (s)", values.get("p95")
+
+
+def format_value(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    with open(args.candidate) as fp:
+        candidate = json.load(fp)
+
+    before = dict(rows(baseline))
+    after = dict(rows(candidate))
+    names = list(before) + [name for name in after if name not in before]
+    print(f"{'':<34} {baseline['meta']['commit']:>10} {candidate['meta']['commit']:>10} {'change':>8}")
+    for name in names:
+        old, new = before.get(name), after.get(name)
+        change = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else ""
+        print(f"{name:<34} {format_value(old):>10} {format_value(new):>10} {change:>8}")
+
+
+if __name__ == "__main__":
+    main()
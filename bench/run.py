@@ -0,0 +1,400 @@
+import argparse
+import ast
+import datetime
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.stubs import OpenAIHandler, RSSHandler, StubServer, TTSHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directories the app writes to, by the pipeline stage that fills them
+DISK_STAGES = {
+    "summarize_articles": "summaries",
+    "text_to_speech": "audio",
+    "briefings": "briefings",
+    "jobs": "jobs",
+    "tmp": "tmp",
+}
+
+_HISTOGRAM_LINE = re.compile(r'^(\w+)_(bucket|sum|count)\{([^}]*)\} (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# Offline benchmark of the whole app against local stand-ins for the feeds,
+# OpenAI and ElevenLabs:
+#   python -m bench.run --requests 50 --concurrency 8 --mode jobs --output result.json
+# The JSON result (latency percentiles, throughput, peak RSS, disk usage and
+# per-stage latencies) can be compared across commits with bench.compare.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=40, help="number of briefings to request")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--mode", choices=("sync", "jobs"), default="sync",
+                        help="blocking POST / or the job API (POST /jobs, poll, download)")
+    parser.add_argument("--combinations", type=int, default=8,
+                        help="number of distinct category/time/detail combinations requested")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--items", type=int, default=20, help="entries per RSS fixture")
+    parser.add_argument("--feed-latency", type=float, default=0.05)
+    parser.add_argument("--feed-error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-latency", type=float, default=1.0)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--tts-duration", type=float, default=1.0)
+    parser.add_argument("--tts-error-rate", type=float, default=0.0)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the app, e.g. TTS_STREAMING=0")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="JSON result file (default: bench/results/<commit>-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# The category names from app.py, read without importing (and configuring) the app
+def app_categories():
+    with open(os.path.join(ROOT, "app.py"), encoding="utf-8") as fp:
+        tree = ast.parse(fp.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(target, "id", None) == "CATEGORIES" for target in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise RuntimeError("CATEGORIES not found in app.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def directory_size(path):
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(directory, name))
+            except OSError:
+                pass
+    return total
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = (len(values) - 1) * fraction
+    lower, upper = math.floor(index), math.ceil(index)
+    return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+
+def summarize_latencies(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+    }
+
+
+# Estimate a percentile from cumulative Prometheus histogram buckets
+def bucket_percentile(buckets, count, fraction):
+    if not count:
+        return None
+    rank = count * fraction
+    previous_bound, previous_count = 0.0, 0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if math.isinf(bound):
+                return previous_bound
+            share = (rank - previous_count) / max(1, cumulative - previous_count)
+            return previous_bound + (bound - previous_bound) * share
+        previous_bound, previous_count = bound, cumulative
+    return previous_bound
+
+
+# Per-stage latency and error counts from the app's /metrics output
+def stage_metrics(text):
+    histograms = {}
+    errors = {}
+    for line in text.splitlines():
+        if line.startswith("customnews_stage_errors_total{"):
+            labels = dict(_LABEL.findall(line))
+            errors[labels.get("stage")] = float(line.rsplit(" ", 1)[1])
+            continue
+        match = _HISTOGRAM_LINE.match(line)
+        if not match or match.group(1) != "customnews_stage_seconds":
+            continue
+        labels = dict(_LABEL.findall(match.group(3)))
+        stage = histograms.setdefault(labels["stage"], {"buckets": [], "sum": 0.0, "count": 0})
+        value = float(match.group(4))
+        if match.group(2) == "bucket":
+            stage["buckets"].append((float(labels["le"]), value))
+        elif match.group(2) == "sum":
+            stage["sum"] = value
+        else:
+            stage["count"] = int(value)
+
+    stages = {}
+    for name, stage in histograms.items():
+        count = stage["count"]
+        stages[name] = {
+            "count": count,
+            "errors": int(errors.get(name, 0)),
+            "mean": stage["sum"] / count if count else None,
+            "p50": bucket_percentile(stage["buckets"], count, 0.5),
+            "p95": bucket_percentile(stage["buckets"], count, 0.95),
+            "p99": bucket_percentile(stage["buckets"], count, 0.99),
+        }
+    return stages
+
+
+# Samples the app's resident memory and the size of its directories until stopped
+class Sampler(threading.Thread):
+    def __init__(self, pid, directories, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.directories = directories
+        self.interval = interval
+        self.peak_rss = None
+        self.peak_disk = {name: 0 for name in directories}
+        self._stop_event = threading.Event()
+
+    def rss(self):
+        try:
+            with open(f"/proc/{self.pid}/status") as fp:
+                for line in fp:
+                    if line.startswith(("VmHWM:", "VmRSS:")):
+                        value = int(line.split()[1]) * 1024
+                        self.peak_rss = max(self.peak_rss or 0, value)
+        except OSError:
+            pass
+
+    def sample(self):
+        self.rss()
+        for name, path in self.directories.items():
+            self.peak_disk[name] = max(self.peak_disk[name], directory_size(path))
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+def workload(categories, args):
+    rng = random.Random(args.seed)
+    combinations = []
+    for _ in range(max(1, args.combinations)):
+        selected = rng.sample(categories, rng.randint(1, min(4, len(categories))))
+        combinations.append({
+            "categories": [category for category in categories if category in selected],
+            "total_time": str(rng.choice([1, 2, 3, 5])),
+            "detail_level": str(rng.randint(1, 5)),
+        })
+    return [rng.choice(combinations) for _ in range(args.requests)]
+
+
+def run_sync(base_url, form, timeout):
+    start = time.perf_counter()
+    with requests.post(f"{base_url}/", data=form, stream=True, timeout=timeout) as response:
+        ttfb = None
+        size = 0
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+        return {
+            "ok": response.status_code == 200 and size > 0,
+            "status": response.status_code,
+            "latency": time.perf_counter() - start,
+            "ttfb": ttfb,
+            "bytes": size,
+            "rejected": 0,
+        }
+
+
+def run_job(base_url, form, timeout):
+    start = time.perf_counter()
+    deadline = start + timeout
+    rejected = 0
+    while True:
+        response = requests.post(f"{base_url}/jobs", data=form, timeout=timeout)
+        if response.status_code != 429 or time.perf_counter() > deadline:
+            break
+        rejected += 1
+        time.sleep(min(1.0, float(response.headers.get("Retry-After", 1))))
+    if response.status_code not in (200, 202):
+        return {"ok": False, "status": response.status_code, "latency": time.perf_counter() - start,
+                "ttfb": None, "bytes": 0, "rejected": rejected}
+
+    job = response.json()
+    while job["stage"] not in ("done", "failed") and time.perf_counter() < deadline:
+        time.sleep(0.2)
+        job.update(requests.get(f"{base_url}{job['status_url']}", timeout=timeout).json())
+    if job["stage"] != "done":
+        return {"ok": False, "status": job["stage"], "latency": time.perf_counter() - start,
+                "ttfb": None, "bytes": 0, "rejected": rejected}
+
+    audio = requests.get(f"{base_url}{job['audio_url']}", timeout=timeout)
+    latency = time.perf_counter() - start
+    return {"ok": audio.status_code == 200, "status": audio.status_code, "latency": latency,
+            "ttfb": latency, "bytes": len(audio.content), "rejected": rejected}
+
+
+def start_app(port, feed_base, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.serve", "--port", str(port), "--feed-base", feed_base],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"app exited with code {process.returncode}")
+        try:
+            requests.get(f"{base_url}/metrics", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("app did not start within 30 seconds")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="customnews-bench-")
+    directories = {name: os.path.join(work_dir, name) for name in DISK_STAGES.values()}
+    for path in directories.values():
+        os.makedirs(path, exist_ok=True)
+
+    categories = app_categories()
+
+    feeds = StubServer(RSSHandler, latency=args.feed_latency, error_rate=args.feed_error_rate,
+                       categories=categories, items=args.items).start()
+    llm = StubServer(OpenAIHandler, latency=args.openai_latency, error_rate=args.openai_error_rate).start()
+    tts = StubServer(TTSHandler, latency=args.tts_latency, error_rate=args.tts_error_rate,
+                     duration=args.tts_duration).start()
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{llm.url}/v1",
+        "ELEVENLABS_API_KEY": "bench",
+        "ELEVENLABS_API_URL": tts.url,
+        "SUMMARY_CACHE_DB": os.path.join(directories["summaries"], "summaries.db"),
+        "AUDIO_CACHE_DIR": directories["audio"],
+        "BRIEFING_DIR": directories["briefings"],
+        "JOB_DIR": directories["jobs"],
+        "TMPDIR": directories["tmp"],
+        "LOG_LEVEL": "WARNING",
+    })
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    process, base_url = start_app(free_port(), feeds.url, env)
+    sampler = Sampler(process.pid, directories)
+    sampler.start()
+    forms = workload(categories, args)
+    run = run_job if args.mode == "jobs" else run_sync
+
+    def request(form):
+        try:
+            return run(base_url, form, args.timeout)
+        except requests.RequestException as e:
+            return {"ok": False, "status": type(e).__name__, "latency": None, "ttfb": None, "bytes": 0, "rejected": 0}
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            results = list(executor.map(request, forms))
+        elapsed = time.perf_counter() - start
+        metrics_text = requests.get(f"{base_url}/metrics", timeout=10).text
+        sampler.stop()
+        final_disk = {name: directory_size(path) for name, path in directories.items()}
+    finally:
+        process.terminate()
+        process.wait(10)
+        for stub in (feeds, llm, tts):
+            stub.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    successful = [result for result in results if result["ok"]]
+    statuses = {}
+    for result in results:
+        statuses[str(result["status"])] = statuses.get(str(result["status"]), 0) + 1
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "args": vars(args),
+        },
+        "requests": len(results),
+        "successful": len(successful),
+        "errors": len(results) - len(successful),
+        "rejected": sum(result["rejected"] for result in results),
+        "statuses": statuses,
+        "duration": elapsed,
+        "throughput": len(successful) / elapsed if elapsed else None,
+        "latency": summarize_latencies([result["latency"] for result in successful]),
+        "ttfb": summarize_latencies([result["ttfb"] for result in successful if result["ttfb"] is not None]),
+        "audio_bytes": sum(result["bytes"] for result in successful),
+        "peak_rss_bytes": sampler.peak_rss,
+        "disk_bytes": {
+            stage: {"peak": sampler.peak_disk[name], "final": final_disk[name]}
+            for stage, name in DISK_STAGES.items()
+        },
+        "stages": stage_metrics(metrics_text),
+        "stubs": {
+            name: {"requests": stub.requests, "errors": stub.errors}
+            for name, stub in (("feeds", feeds), ("openai", llm), ("tts", tts))
+        },
+    }
+
+    output = args.output or os.path.join(
+        ROOT, "bench", "results", f"{report['meta']['commit']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fp:
+        json.dump(report, fp, indent=2)
+
+    latency = report["latency"]
+    print(f"{report['successful']}/{report['requests']} ok, {report['throughput'] or 0:.2f} req/s, "
+          f"p50 {latency['p50'] or 0:.2f} s, p95 {latency['p95'] or 0:.2f} s, p99 {latency['p99'] or 0:.2f} s, "
+          f"peak RSS {(report['peak_rss_bytes'] or 0) / 2 ** 20:.1f} MiB")
+    for stage, values in sorted(report["stages"].items()):
+        print(f"  {stage:<20} n={values['count']:<5} p50 {values['p50'] or 0:.3f} s  p95 {values['p95'] or 0:.3f} s"
+              f"  errors {values['errors']}")
+    print(f"result written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import logging
+import os
+
+from werkzeug.serving import make_server
+
+from bench.stubs import slug
+
+
+# Run the app for a benchmark with every category feed pointing at the RSS stub:
+#   python -m bench.serve --port 5001 --feed-base http://127.0.0.1:8001
+# OpenAI and ElevenLabs are redirected through OPENAI_BASE_URL and ELEVENLABS_API_URL.
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--feed-base", required=True)
+    args = parser.parse_args()
+
+    # Background threads that fetch feeds are started below, once the feeds
+    # point at the stub. The variables are set instead of removed so a .env
+    # file loaded by the app cannot switch them on with the live feed URLs.
+    refresh_interval = float(os.environ.get("FEED_REFRESH_INTERVAL", 0))
+    scheduler = os.environ.get("BRIEFING_SCHEDULER", "0") == "1"
+    os.environ["FEED_REFRESH_INTERVAL"] = "0"
+    os.environ["BRIEFING_SCHEDULER"] = "0"
+
+    import app
+
+    for category in app.CATEGORIES:
+        app.CATEGORIES[category] = f"{args.feed_base.rstrip('/')}/{slug(category)}.xml"
+    if refresh_interval > 0:
+        app.feed_cache.start_refresher(app.CATEGORIES.values(), refresh_interval)
+    if scheduler:
+        app.briefing_scheduler.start()
+
+    # Keep the access log out of the benchmark output unless LOG_LEVEL asks for it
+    logging.getLogger("werkzeug").setLevel(os.getenv("LOG_LEVEL", "INFO"))
+    make_server(args.host, args.port, app.app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import email.utils
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz, no padding: 417 bytes per frame
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x00"
+MP3_FRAME_SIZE = 417
+
+
+# Function to build a silent but well-formed MP3 stream of the given number of frames
+def mp3_frames(count):
+    frame = MP3_FRAME_HEADER + b"\x00" * (MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    return frame * count
+
+
+# A local HTTP server running on a background thread.
+# `latency` delays the first byte, `error_rate` answers that share of requests with a 500.
+class StubServer:
+    def __init__(self, handler, latency=0.0, error_rate=0.0, host="127.0.0.1", port=0, **options):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.options = options
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(handler):
+            server_stub = stub
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # Count the request and decide whether it should fail
+    def admit(self):
+        with self._lock:
+            self.requests += 1
+            fail = random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return not fail
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_stub = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_body(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_response(self):
+        self.send_body(500, "application/json", b'{"error": "injected failure"}')
+
+
+_WORDS = (
+    "Regierung Bundestag Forschung Studie Markt Aktie Mission Mond Rakete Spiel Trainer Saison "
+    "Verein Kiew Front Waffenruhe Modell Daten Algorithmus Roboter Klima Energie Preis Anleger "
+    "Wissenschaftler Ergebnis Bericht Experten Entscheidung Woche Montag heute erstmals neue "
+    "deutlich weiter gegen nach wegen trotz mehr als bisher laut einer eines die der das und"
+).split()
+
+
+def slug(category):
+    return re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-")
+
+
+# Function to build a static RSS fixture for a category. Every fifth item
+# repeats a story of the shared pool so duplicates across feeds exist.
+def rss_fixture(category, items=20, words=80):
+    rng = random.Random(category)
+    shared = random.Random("shared")
+    now = time.time()
+    entries = []
+    for i in range(items):
+        source = shared if i % 5 == 0 else rng
+        text = " ".join(source.choice(_WORDS) for _ in range(words))
+        title = f"{category}: Meldung {i + 1}"
+        published = email.utils.formatdate(now - i * 600, usegmt=True)
+        entries.append(
+            f"<item><title>{title}</title>"
+            f"<link>https://example.invalid/{slug(category)}/{i + 1}</link>"
+            f"<guid>{slug(category)}-{i + 1}</guid>"
+            f"<pubDate>{published}</pubDate>"
+            f"<description>&lt;p&gt;{text}.&lt;/p&gt;&lt;img src=\"x.jpg\"/&gt;</description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+        f"<title>{category}</title>{''.join(entries)}</channel></rss>"
+    ).encode("utf-8")
+
+
+# RSS stand-in: serves /<slug>.xml for every category passed as `categories`,
+# answering If-None-Match with 304
+class RSSHandler(StubHandler):
+    def do_GET(self):
+        stub = self.server_stub
+        if not stub.admit():
+            self.send_error_response()
+            return
+
+        fixtures = stub.options.setdefault("fixtures", {})
+        name = self.path.strip("/").removesuffix(".xml")
+        if name not in fixtures:
+            categories = {slug(category): category for category in stub.options.get("categories", [])}
+            if name not in categories:
+                self.send_body(404, "text/plain", b"not found")
+                return
+            fixtures[name] = rss_fixture(categories[name], stub.options.get("items", 20))
+
+        time.sleep(stub.latency)
+        body = fixtures[name]
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_body(200, "application/rss+xml; charset=utf-8", body, {"ETag": etag})
+
+
+# OpenAI stand-in for /v1/chat/completions, answering with a summary of the requested length
+class OpenAIHandler(StubHandler):
+    def do_POST(self):
+        stub = self.server_stub
+        data = self.read_json()
+        if not stub.admit():
+            self.send_error_response()
+            return
+
+        time.sleep(stub.latency)
+        messages = data.get("messages", [])
+        prompt = " ".join(message.get("content", "") for message in messages)
+        match = re.search(r"(\d+) Wörtern", prompt)
+        words = int(match.group(1)) if match else 50
+        rng = random.Random(prompt)
+        content = " ".join(rng.choice(_WORDS) for _ in range(words)) + "."
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        body = json.dumps({
+            "id": f"chatcmpl-{stub.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": data.get("model", "gpt-4"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }).encode("utf-8")
+        self.send_body(200, "application/json", body)
+
+
+# ElevenLabs stand-in: streams MP3 frames in `chunks` pieces spread over `duration` seconds.
+# Without a fixed number of `frames` the audio length follows the text (`frames_per_char`).
+class TTSHandler(StubHandler):
+    def do_POST(self):
+        stub = self.server_stub
+        data = self.read_json()
+        if not stub.admit():
+            self.send_error_response()
+            return
+
+        time.sleep(stub.latency)
+        frames = stub.options.get("frames")
+        if frames is None:
+            frames = max(1, int(len(data.get("text", "")) * stub.options.get("frames_per_char", 2.5)))
+        audio = mp3_frames(frames)
+        chunks = max(1, stub.options.get("chunks", 20))
+        interval = stub.options.get("duration", 0.0) / chunks
+        size = -(-len(audio) // chunks)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for offset in range(0, len(audio), size):
+            piece = audio[offset:offset + size]
+            self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            self.wfile.flush()
+            time.sleep(interval)
+        self.wfile.write(b"0\r\n\r\n")
@@ -0,0 +1,57 @@
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from audio import AudioCache
+from bench.stubs import StubServer, TTSHandler
+
+
+# Measure time to first audio byte of the TTS stage, buffered vs. streaming,
+# against a local ElevenLabs stand-in:
+#   python -m bench.tts_ttfb --latency 0.5 --duration 3
+def measure(app_module, streaming, runs, segments):
+    app_module.TTS_STREAMING = streaming
+    ttfb, total = [], []
+    for _ in range(runs):
+        # Start every run with an empty segment cache
+        app_module.audio_cache = AudioCache(tempfile.mkdtemp(prefix="tts-ttfb-"))
+        with app_module.app.test_request_context():
+            start = time.perf_counter()
+            response = app_module.audio_response([f"Kategorie {i}: Test" for i in range(segments)])
+            body = iter(response.response)
+            next(body)
+            ttfb.append(time.perf_counter() - start)
+            for _ in body:
+                pass
+            total.append(time.perf_counter() - start)
+            response.close()
+    return {"ttfb": sum(ttfb) / runs, "total": sum(total) / runs}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.5, help="delay before the first audio byte")
+    parser.add_argument("--duration", type=float, default=3.0, help="time to stream the whole file")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--segments", type=int, default=1, help="number of category segments")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with StubServer(TTSHandler, latency=args.latency, duration=args.duration, frames=args.frames) as tts:
+        os.environ["ELEVENLABS_API_URL"] = tts.url
+        import app as app_module
+        app_module.ELEVENLABS_API_URL = tts.url
+
+        temp_pattern = os.path.join(tempfile.gettempdir(), "**", "*.part")
+        temp_before = set(glob.glob(temp_pattern, recursive=True))
+        for label, streaming in (("buffered", False), ("streaming", True)):
+            result = measure(app_module, streaming, args.runs, args.segments)
+            print(f"{label:>10}: TTFB {result['ttfb'] * 1000:8.1f} ms, total {result['total'] * 1000:8.1f} ms")
+        leaked = set(glob.glob(temp_pattern, recursive=True)) - temp_before
+        print(f"leftover temp files: {len(leaked)}")
+
+
+if __name__ == "__main__":
+    main()
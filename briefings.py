@@ -0,0 +1,232 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# Function to normalize briefing parameters into a hashable tuple.
+# Categories are deduplicated and put into the order of `known_categories`.
+def normalize_params(categories, total_time, detail_level, known_categories):
+    order = list(known_categories)
+    selected = sorted({category for category in categories if category in known_categories}, key=order.index)
+    return tuple(selected), int(total_time), int(detail_level)
+
+
+def params_key(params):
+    categories, total_time, detail_level = params
+    return json.dumps([list(categories), total_time, detail_level], ensure_ascii=False)
+
+
+def params_from_key(key):
+    categories, total_time, detail_level = json.loads(key)
+    return tuple(categories), total_time, detail_level
+
+
+# Fingerprint of the feed entries a briefing is built from
+def feed_fingerprint(article_ids_by_category):
+    payload = json.dumps(article_ids_by_category, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Request counts per parameter tuple and finished briefing MP3s, kept in a
+# directory with a SQLite index so the web process and a separate worker
+# process on the same filesystem can share it.
+class BriefingStore:
+    def __init__(self, directory, window=24 * 3600):
+        self.directory = directory
+        self.window = window
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "generated": 0, "pruned": 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self.db_path = os.path.join(self.directory, "briefings.db")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                "params TEXT NOT NULL, hour INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (params, hour))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "params TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                "path TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    # Count a request for the parameter tuple in the current hour
+    def record_request(self, params):
+        hour = int(time.time() // 3600)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO requests (params, hour, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (params, hour) DO UPDATE SET count = count + 1",
+                (params_key(params), hour),
+            )
+            conn.execute(
+                "DELETE FROM requests WHERE hour < ?", (hour - int(self.window // 3600) - 1,)
+            )
+
+    # The n most requested parameter tuples within the window
+    def top(self, n):
+        since = int((time.time() - self.window) // 3600)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT params, SUM(count) AS total FROM requests WHERE hour >= ? "
+                "GROUP BY params ORDER BY total DESC LIMIT ?",
+                (since, n),
+            ).fetchall()
+        return [(params_from_key(key), total) for key, total in rows]
+
+    # Return the path of the stored briefing if it was built from the same feed entries.
+    # current_fingerprint() is only called when a briefing is stored for the params.
+    def get(self, params, current_fingerprint):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fingerprint, path FROM artifacts WHERE params = ?", (params_key(params),)
+            ).fetchone()
+        if row is None or not os.path.exists(row[1]):
+            self._count("misses")
+            return None
+        if row[0] != current_fingerprint():
+            self._count("stale")
+            return None
+        self._count("hits")
+        return row[1]
+
+    def fingerprint(self, params):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT fingerprint FROM artifacts WHERE params = ?", (params_key(params),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def save(self, params, fingerprint, audio):
+        key = params_key(params)
+        name = hashlib.sha256(f"{key}\n{fingerprint}".encode("utf-8")).hexdigest()
+        path = os.path.join(self.directory, f"{name}.mp3")
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(audio)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM artifacts WHERE params = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (params, fingerprint, path, created_at) VALUES (?, ?, ?, ?)",
+                (key, fingerprint, path, time.time()),
+            )
+        # Readers that already opened the old file keep their handle
+        if row is not None and row[0] != path and os.path.exists(row[0]):
+            os.remove(row[0])
+        self._count("generated")
+        return path
+
+    # Remove the stored briefings of all parameter tuples except `keep`
+    def prune(self, keep):
+        keep = {params_key(params) for params in keep}
+        with self._connect() as conn:
+            rows = conn.execute("SELECT params, path FROM artifacts").fetchall()
+            removed = [(key, path) for key, path in rows if key not in keep]
+            conn.executemany("DELETE FROM artifacts WHERE params = ? AND path = ?", removed)
+        for _, path in removed:
+            if os.path.exists(path):
+                os.remove(path)
+        with self._lock:
+            self._stats["pruned"] += len(removed)
+        return len(removed)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        with self._connect() as conn:
+            stats["artifacts"] = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            stats["tracked"] = conn.execute("SELECT COUNT(DISTINCT params) FROM requests").fetchone()[0]
+        return stats
+
+
+# Regenerates the briefings of the top_n most requested parameter tuples
+# every `interval` seconds whenever their feed fingerprint changed, and drops
+# the briefings of tuples that left the top_n (or the request window).
+# `fingerprint(params)` returns the current fingerprint, `generate(params)`
+# the finished MP3 bytes (or None if there is nothing to say).
+class BriefingScheduler:
+    def __init__(self, store, generate, fingerprint, top_n=5, interval=300):
+        self.store = store
+        self.generate = generate
+        self.fingerprint = fingerprint
+        self.top_n = top_n
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_once(self):
+        top = [params for params, _ in self.store.top(self.top_n)]
+        try:
+            pruned = self.store.prune(top)
+            if pruned:
+                logger.info(f"{pruned} nicht mehr gefragte Briefings entfernt")
+        except Exception as e:
+            logger.warning(f"Fehler beim Entfernen alter Briefings: {e}")
+        for params in top:
+            try:
+                fingerprint = self.fingerprint(params)
+                if self.store.fingerprint(params) == fingerprint:
+                    continue
+                audio = self.generate(params)
+                if audio:
+                    self.store.save(params, fingerprint, audio)
+                    logger.info(f"Briefing vorberechnet: {params_key(params)}")
+            except Exception as e:
+                logger.warning(f"Fehler beim Vorberechnen des Briefings {params_key(params)}: {e}")
+
+    def run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="briefing-scheduler", daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+
+# Separate worker process: python briefings.py. It only helps when it shares
+# BRIEFING_DIR with the web process, i.e. runs on the same machine; platforms
+# that give every process its own filesystem need BRIEFING_SCHEDULER=1 instead.
+if __name__ == "__main__":
+    import app
+
+    app.briefing_scheduler.start()
+    app.briefing_scheduler.join()
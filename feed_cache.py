@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import feedparser
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+# Download a feed with a socket timeout (feedparser has none) and parse it.
+# Conditional requests get a 304 result without entries, like feedparser.parse.
+def download_feed(url, etag=None, modified=None, timeout=15):
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        feed = feedparser.FeedParserDict(entries=[], bozo=False)
+    else:
+        feed = feedparser.parse(response.content, response_headers={
+            "content-type": response.headers.get("Content-Type", ""),
+            "content-location": response.url,
+        })
+    feed["status"] = response.status_code
+    feed["href"] = response.url
+    feed["etag"] = response.headers.get("ETag")
+    feed["modified"] = response.headers.get("Last-Modified")
+    return feed
+
+
+# A parsed feed together with the validators needed for conditional requests
+class CachedFeed:
+    def __init__(self, feed, etag=None, modified=None, fetched_at=None, failed=False):
+        self.feed = feed
+        self.failed = failed
+        self.etag = etag
+        self.modified = modified
+        self.fetched_at = fetched_at if fetched_at is not None else time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+
+# In-memory cache for parsed RSS feeds.
+# Entries younger than `ttl` are served directly. Older entries are served
+# stale for up to `stale_ttl` more seconds while a refresh runs in the
+# background (stale-while-revalidate). Refreshes send ETag/Last-Modified so
+# unchanged feeds cost a 304 instead of a full download. Failed downloads
+# (HTTP errors, unparsable feeds without entries) never replace good entries;
+# without one they are remembered for `negative_ttl` seconds only.
+class FeedCache:
+    def __init__(self, ttl=300, stale_ttl=3600, max_size=32, parse=download_feed, negative_ttl=30):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._parse = parse
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._refreshing = set()
+        self._refresher = None
+        self._stop = threading.Event()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "not_modified": 0,
+            "errors": 0,
+            "evictions": 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _url_lock(self, url):
+        with self._lock:
+            return self._url_locks.setdefault(url, threading.Lock())
+
+    def _lookup(self, url):
+        with self._lock:
+            cached = self._entries.get(url)
+            if cached is not None:
+                self._entries.move_to_end(url)
+            return cached
+
+    def _store(self, url, cached):
+        with self._lock:
+            self._entries[url] = cached
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._url_locks.pop(evicted, None)
+                self._stats["evictions"] += 1
+
+    # Return the parsed feed for url, downloading it only on a cold miss
+    def get(self, url):
+        cached = self._lookup(url)
+        if cached is not None:
+            age = cached.age()
+            if cached.failed:
+                if age < self.negative_ttl:
+                    self._count("negative_hits")
+                    return cached.feed
+            elif age < self.ttl:
+                self._count("hits")
+                return cached.feed
+            elif age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._refresh_in_background(url)
+                return cached.feed
+
+        self._count("misses")
+        return self.refresh(url)
+
+    # Fetch url with a conditional request and update the cache
+    def refresh(self, url):
+        with self._url_lock(url):
+            cached = self._lookup(url)
+            # Another thread may have refreshed the feed while we waited for the lock
+            if cached is not None and cached.age() < (min(1, self.negative_ttl) if cached.failed else 1):
+                return cached.feed
+
+            kwargs = {}
+            if cached is not None:
+                if cached.etag:
+                    kwargs["etag"] = cached.etag
+                if cached.modified:
+                    kwargs["modified"] = cached.modified
+
+            self._count("refreshes")
+            try:
+                feed = self._parse(url, **kwargs)
+            except Exception as e:
+                self._count("errors")
+                if cached is not None and not cached.failed:
+                    logger.warning(f"Feed konnte nicht aktualisiert werden ({url}): {e}")
+                    return cached.feed
+                # Requests waiting for this url (and those within negative_ttl) get an empty feed
+                empty = feedparser.FeedParserDict(entries=[], bozo=True, bozo_exception=e)
+                self._store(url, CachedFeed(empty, failed=True))
+                raise
+
+            if cached is not None and not cached.failed and feed.get("status") == 304:
+                self._count("not_modified")
+                cached.fetched_at = time.monotonic()
+                return cached.feed
+
+            if feed.get("status", 200) >= 400 or (feed.get("bozo") and not feed.entries):
+                self._count("errors")
+                if cached is not None and not cached.failed:
+                    # Keep serving the old entries, the next request retries the download
+                    return cached.feed
+                logger.warning(f"Feed konnte nicht geladen werden ({url}): Status {feed.get('status')}")
+                self._store(url, CachedFeed(feed, failed=True))
+                return feed
+
+            self._store(url, CachedFeed(feed, feed.get("etag"), feed.get("modified")))
+            return feed
+
+    def _refresh_in_background(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def run():
+            try:
+                self.refresh(url)
+            except Exception as e:
+                logger.warning(f"Feed konnte nicht aktualisiert werden ({url}): {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # Keep the given feeds warm by refreshing them every `interval` seconds
+    def start_refresher(self, urls, interval):
+        if self._refresher is not None:
+            return
+        urls = list(urls)
+
+        def run():
+            while not self._stop.is_set():
+                for url in urls:
+                    try:
+                        self.refresh(url)
+                    except Exception as e:
+                        logger.warning(f"Feed konnte nicht aktualisiert werden ({url}): {e}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._refresher = threading.Thread(target=run, name="feed-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_refresher(self):
+        self._stop.set()
+        self._refresher = None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._url_locks.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["ttl"] = self.ttl
+        stats["stale_ttl"] = self.stale_ttl
+        stats["negative_ttl"] = self.negative_ttl
+        return stats
@@ -0,0 +1,158 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("queued", "fetching", "summarizing", "synthesizing", "done", "failed")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+# A briefing generation job and its progress
+class Job:
+    def __init__(self, key, params):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.stage = "queued"
+        self.progress = 0.0
+        self.error = None
+        self.audio_path = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # The job runs in a copy of the submitter's context, e.g. to keep its request id
+        self.context = contextvars.copy_context()
+
+    def update(self, stage, progress=0.0):
+        # Late progress callbacks (e.g. of abandoned TTS segments) must not reopen a finished job
+        if self.finished:
+            return
+        # finished_at is set first so a finished job always has one
+        if stage in ("done", "failed"):
+            self.finished_at = time.time()
+        self.stage = stage
+        self.progress = round(min(1.0, max(0.0, progress)), 3)
+
+    @property
+    def finished(self):
+        return self.stage in ("done", "failed")
+
+    def to_dict(self):
+        categories, total_time, detail_level = self.params
+        return {
+            "id": self.id,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "categories": list(categories),
+            "total_time": total_time,
+            "detail_level": detail_level,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# Runs jobs on `workers` threads fed by a bounded queue.
+# `run(params, progress)` generates the MP3 bytes of a job and reports its
+# stage through progress(stage, fraction). Submitting a job whose key is
+# already queued or running returns that job instead of a new one. Finished
+# jobs and their audio files are dropped after `result_ttl` seconds.
+class JobManager:
+    def __init__(self, run, directory, workers=2, max_queue=10, result_ttl=3600):
+        self.run = run
+        self.directory = directory
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(max(1, self.workers)):
+                thread = threading.Thread(target=self._work, name=f"briefing-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # Returns the job and whether it was newly created, raises JobQueueFull
+    def submit(self, key, params):
+        self.start()
+        self._expire()
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                return job, False
+            job = Job(key, params)
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise JobQueueFull(f"Warteschlange voll ({self._queue.maxsize} Jobs)")
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                job.context.run(self._run_job, job)
+            finally:
+                with self._lock:
+                    if self._in_flight.get(job.key) is job:
+                        del self._in_flight[job.key]
+                self._queue.task_done()
+
+    def _run_job(self, job):
+        try:
+            job.update("fetching")
+            audio = self.run(job.params, job.update)
+            if not audio:
+                raise ValueError("Keine Nachrichten gefunden")
+            path = os.path.join(self.directory, f"{job.id}.mp3")
+            with open(path, "wb") as fp:
+                fp.write(audio)
+            job.audio_path = path
+            job.update("done", 1.0)
+        except Exception as e:
+            logger.warning(f"Job {job.id} fehlgeschlagen: {e}")
+            job.error = str(e)
+            job.update("failed", job.progress)
+
+    def _expire(self):
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished and job.finished_at is not None and now - job.finished_at > self.result_ttl]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.audio_path and os.path.exists(job.audio_path):
+                os.remove(job.audio_path)
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            in_flight = len(self._in_flight)
+        stats = {stage: 0 for stage in STAGES}
+        for job in jobs:
+            stats[job.stage] += 1
+        stats["in_flight"] = in_flight
+        stats["queue_size"] = self._queue.qsize()
+        stats["queue_limit"] = self._queue.maxsize
+        return stats
@@ -0,0 +1,233 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_request_id = contextvars.ContextVar("request_id", default="-")
+_tags = contextvars.ContextVar("tags", default={})
+
+enabled = True
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_value(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(float(bound))
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+# Collection of metrics rendered in the Prometheus text exposition format.
+# Collectors are callables returning (name, documentation, label names,
+# {label values tuple: value}) for gauges read at scrape time, e.g. cache statistics.
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def collector(self, collect):
+        self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            name, documentation, labels, values = collect()
+            gauge = Gauge(name, documentation, labels)
+            gauge._values = dict(values)
+            lines.extend(gauge.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "customnews_stage_seconds", "Duration of pipeline stages in seconds.", ("stage",))
+STAGE_ERRORS = registry.counter(
+    "customnews_stage_errors_total", "Pipeline stages that raised an error.", ("stage",))
+STAGE_IN_FLIGHT = registry.gauge(
+    "customnews_stage_in_flight", "Pipeline stages currently running.", ("stage",))
+TOKENS = registry.counter(
+    "customnews_tokens_total", "OpenAI tokens by kind (input, output, saved).", ("kind",))
+AUDIO_BYTES = registry.counter(
+    "customnews_audio_bytes_total", "Bytes of synthesized audio.", ("source",))
+HTTP_SECONDS = registry.histogram(
+    "customnews_http_request_seconds", "Time until the response headers are ready.", ("endpoint", "status"))
+HTTP_IN_FLIGHT = registry.gauge(
+    "customnews_http_in_flight", "HTTP requests currently being handled.", ("endpoint",))
+
+
+def new_request_id(request_id=None):
+    request_id = request_id or uuid.uuid4().hex[:12]
+    _request_id.set(request_id)
+    return request_id
+
+
+def get_request_id():
+    return _request_id.get()
+
+
+# Tags added to every span opened inside the block (also in threads started via submit)
+@contextmanager
+def tags(**values):
+    token = _tags.set({**_tags.get(), **values})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+# Submit fn to an executor so it runs with the current request id and tags
+def submit(executor, fn, *args, **kwargs):
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+# Time a pipeline stage. The yielded dict collects tags (article count, tokens,
+# audio bytes, ...) that are logged together with the duration.
+@contextmanager
+def span(stage, **values):
+    span_tags = {**_tags.get(), **values}
+    if not enabled:
+        yield span_tags
+        return
+
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield span_tags
+    except BaseException:
+        status = "error"
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_SECONDS.observe(duration, stage=stage)
+        if logger.isEnabledFor(logging.INFO):
+            fields = " ".join(f"{key}={value}" for key, value in span_tags.items())
+            logger.info("span stage=%s status=%s duration_ms=%.1f %s", stage, status, duration * 1000, fields)
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+# Log to stderr with the request id on every line; METRICS_ENABLED=0 turns the
+# metrics off, LOG_LEVEL=WARNING silences the per-stage span lines
+def configure(level="INFO", metrics_enabled=True):
+    global enabled
+    enabled = metrics_enabled
+    handler = logging.StreamHandler()
+    handler.addFilter(_RequestIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# Stable identifier of a feed entry: its id, its link or, as a last resort, a hash of its text
+def article_id(article):
+    identifier = article.get("id") or article.get("link")
+    if identifier:
+        return identifier
+    return hashlib.sha256(article.get("summary", "").encode("utf-8")).hexdigest()
+
+
+# Round a word count to the nearest bucket so near-identical requests share summaries
+def word_bucket(word_count, bucket_size=25):
+    if bucket_size <= 1:
+        return max(1, int(word_count))
+    return max(bucket_size, int(round(word_count / bucket_size)) * bucket_size)
+
+
+# Content-addressed key of a summary: same articles, length, model and prompt => same summary
+def make_key(article_ids, word_count, model, prompt_template):
+    payload = json.dumps(
+        {"articles": list(article_ids), "words": word_count, "model": model, "prompt": prompt_template},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Summary cache with an in-process LRU and an optional SQLite backing store.
+# Entries older than `max_age` seconds are dropped from both layers; the LRU
+# holds at most `max_size` entries and the database at most `db_max_size`.
+class SummaryCache:
+    def __init__(self, max_size=256, max_age=6 * 3600, db_path=None, db_max_size=5000):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.db_path = db_path
+        self.db_max_size = db_max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "db_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "db_expired": 0,
+            "db_evictions": 0,
+            "db_errors": 0,
+        }
+        if self.db_path:
+            self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._db_lock, self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS summaries_accessed ON summaries (accessed_at)")
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _remember(self, key, summary, created_at):
+        with self._lock:
+            self._entries[key] = (summary, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                summary, created_at = entry
+                if now - created_at < self.max_age:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return summary
+                del self._entries[key]
+                self._stats["expired"] += 1
+
+        if self.db_path:
+            row = self._db_get(key, now)
+            if row is not None:
+                summary, created_at = row
+                self._remember(key, summary, created_at)
+                self._count("db_hits")
+                return summary
+
+        self._count("misses")
+        return None
+
+    def put(self, key, summary):
+        now = time.time()
+        self._remember(key, summary, now)
+        self._count("stores")
+        if self.db_path:
+            self._db_put(key, summary, now)
+
+    def _db_get(self, key, now):
+        try:
+            with self._db_lock, self._connect() as conn:
+                row = conn.execute(
+                    "SELECT summary, created_at FROM summaries WHERE key = ? AND created_at > ?",
+                    (key, now - self.max_age),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE summaries SET accessed_at = ? WHERE key = ?", (now, key))
+                return row
+        except sqlite3.Error as e:
+            logger.warning(f"Fehler beim Lesen des Zusammenfassungs-Caches: {e}")
+            self._count("db_errors")
+            return None
+
+    def _db_put(self, key, summary, now):
+        try:
+            with self._db_lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO summaries (key, summary, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, summary, now, now),
+                )
+                expired = conn.execute(
+                    "DELETE FROM summaries WHERE created_at <= ?", (now - self.max_age,)
+                ).rowcount
+                evicted = conn.execute(
+                    "DELETE FROM summaries WHERE key IN ("
+                    "SELECT key FROM summaries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.db_max_size,),
+                ).rowcount
+            self._count("db_expired", max(0, expired))
+            self._count("db_evictions", max(0, evicted))
+        except sqlite3.Error as e:
+            logger.warning(f"Fehler beim Schreiben des Zusammenfassungs-Caches: {e}")
+            self._count("db_errors")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._db_lock, self._connect() as conn:
+                conn.execute("DELETE FROM summaries")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["db_hits"]) / lookups, 3) if lookups else 0.0
+        stats["max_age"] = self.max_age
+        if self.db_path:
+            try:
+                with self._db_lock, self._connect() as conn:
+                    stats["db_size"] = conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            except sqlite3.Error:
+                stats["db_size"] = None
+        return stats
@@ -0,0 +1,97 @@
+import time
+
+import feedparser
+
+from articles import count_tokens, minhash, prepare_articles, similarity, strip_markup, truncate_tokens
+
+STORY = (
+    "Die Raumsonde hat nach einer Reise von sieben Jahren den Asteroiden erreicht und erste Bilder "
+    "seiner zerklüfteten Oberfläche zur Erde gesendet, teilte die Weltraumagentur am Montag mit."
+)
+OTHER_STORY = (
+    "Der Verein verlor das Heimspiel gegen den Tabellenletzten überraschend mit null zu zwei und "
+    "rutscht damit in der Tabelle auf den achten Platz ab, der Trainer steht in der Kritik."
+)
+
+
+def article(summary, title="Titel", hours_ago=0):
+    return feedparser.FeedParserDict(
+        title=title,
+        summary=summary,
+        published_parsed=time.localtime(time.time() - hours_ago * 3600),
+    )
+
+
+def long_text(words):
+    return " ".join(f"wort{i}" for i in range(words))
+
+
+def test_strip_markup():
+    text = '<p>Erster&nbsp;Absatz</p><script>var x = 1;</script><div>Zweiter <b>Absatz</b> &amp; mehr</div>'
+
+    assert strip_markup(text) == "Erster Absatz Zweiter Absatz & mehr"
+    assert strip_markup("  ohne   Markup ") == "ohne Markup"
+
+
+def test_minhash_similarity():
+    assert similarity(minhash(STORY), minhash(STORY)) == 1.0
+    reworded = STORY.replace("am Montag", "am Dienstag").replace("erste Bilder", "neue Bilder")
+    assert similarity(minhash(STORY), minhash(reworded)) >= 0.6
+    assert similarity(minhash(STORY), minhash(OTHER_STORY)) < 0.2
+
+
+def test_duplicates_across_categories_are_dropped():
+    candidates = {
+        "Weltall": [article(STORY)],
+        "Nachrichten": [article(f"<p>{STORY}</p>", title="Anderer Titel"), article(OTHER_STORY, hours_ago=1)],
+    }
+
+    prepared, report = prepare_articles(candidates, max_articles=2, token_budget=1000)
+
+    assert [a.summary for a in prepared["Weltall"]] == [STORY]
+    assert [a.summary for a in prepared["Nachrichten"]] == [OTHER_STORY]
+    assert report.duplicates == 1
+
+
+def test_newest_articles_first():
+    candidates = {"Sport": [article("alt " + OTHER_STORY, hours_ago=5), article(STORY, hours_ago=1)]}
+
+    prepared, _ = prepare_articles(candidates, max_articles=1, token_budget=1000)
+
+    assert [a.summary for a in prepared["Sport"]] == [STORY]
+
+
+def test_truncate_tokens():
+    text = long_text(200)
+
+    assert truncate_tokens(text, 10_000) == text
+    truncated = truncate_tokens(text, 50)
+    assert truncated.endswith(" …")
+    assert count_tokens(truncated) <= 50
+    assert text.startswith(truncated[:-2])
+    assert truncate_tokens(text, 0) == ""
+
+
+def test_articles_packed_into_token_budget():
+    candidates = {
+        "KI": [article(long_text(300) + f" ki{i}", hours_ago=i) for i in range(3)],
+        "Sport": [article(long_text(300).replace("wort", "satz") + f" sport{i}", hours_ago=i) for i in range(3)],
+    }
+
+    prepared, report = prepare_articles(candidates, max_articles=3, token_budget=120, threshold=1.1)
+
+    for articles in prepared.values():
+        assert len(articles) == 3
+        assert sum(count_tokens(a.summary) for a in articles) <= 120
+    assert report.truncated == 6
+    assert report.tokens_after <= 240
+    assert report.tokens_saved == report.tokens_before - report.tokens_after > 0
+
+
+def test_original_entries_are_not_modified():
+    entry = article(f"<b>{STORY}</b>")
+
+    prepared, _ = prepare_articles({"Weltall": [entry]}, max_articles=1, token_budget=1000)
+
+    assert entry.summary == f"<b>{STORY}</b>"
+    assert prepared["Weltall"][0].summary == STORY
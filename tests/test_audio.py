@@ -0,0 +1,94 @@
+from audio import frame_length, iter_audio_frames, rechunk
+
+# MPEG-1 Layer III, 128 kbit/s, 44.1 kHz: 417 bytes without and 418 bytes with padding
+HEADER = b"\xff\xfb\x90\x00"
+PADDED_HEADER = b"\xff\xfb\x92\x00"
+
+
+def frame(index, header=HEADER):
+    length = frame_length(header)
+    return header + bytes([index]) * (length - len(header))
+
+
+def id3_tag(payload=b"TIT2 title"):
+    size = len(payload)
+    synchsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b"ID3\x04\x00\x00" + synchsafe + payload
+
+
+def info_frame():
+    data = bytearray(frame(0))
+    data[36:40] = b"Info"
+    return bytes(data)
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_frame_length():
+    assert frame_length(HEADER) == 417
+    assert frame_length(PADDED_HEADER) == 418
+    # MPEG-2 Layer III, 64 kbit/s, 22.05 kHz
+    assert frame_length(b"\xff\xf3\x80\x00") == 208
+    assert frame_length(b"\xff\xfb\xf0\x00") is None  # bad bitrate index
+    assert frame_length(b"\xff\xfb\x9c\x00") is None  # reserved sample rate
+    assert frame_length(b"ID3\x04") is None
+    assert frame_length(b"\xff\xfb") is None
+
+
+def test_drops_id3_tag_and_info_frame():
+    frames = [frame(1), frame(2, PADDED_HEADER), frame(3)]
+    data = id3_tag() + info_frame() + b"".join(frames)
+
+    assert list(iter_audio_frames([data])) == frames
+
+
+def test_info_frame_only_dropped_at_start():
+    frames = [frame(1), info_frame()]
+
+    assert list(iter_audio_frames([b"".join(frames)])) == frames
+
+
+def test_frames_split_across_chunks():
+    frames = [frame(i) for i in range(1, 6)]
+    data = id3_tag(b"x" * 300) + b"".join(frames)
+
+    for size in (1, 3, 100, 417, 1000):
+        assert list(iter_audio_frames(split(data, size))) == frames
+
+
+def test_id3_tag_containing_frame_headers_split_across_chunks():
+    frames = [frame(1), frame(2)]
+    # Cover art or similar binary tag data can contain bytes that look like frame headers
+    data = id3_tag(b"APIC" + frame(9) + b"\x00" * 20) + b"".join(frames)
+
+    assert list(iter_audio_frames([data])) == frames
+    for size in (1, 2, 4, 6, 9, 10, 11):
+        assert list(iter_audio_frames(split(data, size))) == frames
+
+
+def test_resyncs_after_garbage():
+    frames = [frame(1), frame(2), frame(3)]
+    data = frames[0] + b"\x00\x13garbage\xff" + frames[1] + b"TAG" + b"\x00" * 125 + frames[2]
+
+    assert list(iter_audio_frames(split(data, 64))) == frames
+
+
+def test_incomplete_trailing_frame_is_dropped():
+    frames = [frame(1), frame(2)]
+
+    assert list(iter_audio_frames([b"".join(frames) + frame(3)[:100]])) == frames
+
+
+def test_concatenated_files():
+    first = id3_tag() + info_frame() + frame(1) + frame(2)
+    second = id3_tag() + info_frame() + frame(3)
+
+    joined = list(iter_audio_frames([first])) + list(iter_audio_frames([second]))
+    assert joined == [frame(1), frame(2), frame(3)]
+
+
+def test_rechunk():
+    assert list(rechunk([b"ab", b"cd", b"e"], 3)) == [b"abcd", b"e"]
+    assert list(rechunk([], 3)) == []
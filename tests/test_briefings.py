@@ -0,0 +1,75 @@
+import os
+
+from briefings import BriefingScheduler, BriefingStore, normalize_params
+
+CATEGORIES = ["Nachrichten", "KI", "Sport"]
+
+
+def params(*categories, total_time=3, detail_level=2):
+    return normalize_params(categories, total_time, detail_level, CATEGORIES)
+
+
+def test_normalize_params():
+    assert params("Sport", "KI", "KI", "Unbekannt") == (("KI", "Sport"), 3, 2)
+
+
+def test_stored_briefing_is_served_while_fingerprint_matches(tmp_path):
+    store = BriefingStore(str(tmp_path))
+    store.save(params("KI"), "f1", b"audio")
+
+    path = store.get(params("KI"), lambda: "f1")
+    assert open(path, "rb").read() == b"audio"
+    assert store.get(params("KI"), lambda: "f2") is None
+    assert store.get(params("Sport"), lambda: 1 / 0) is None
+    stats = store.stats()
+    assert (stats["hits"], stats["stale"], stats["misses"]) == (1, 1, 1)
+
+
+def test_save_replaces_previous_artifact(tmp_path):
+    store = BriefingStore(str(tmp_path))
+    old = store.save(params("KI"), "f1", b"old")
+    new = store.save(params("KI"), "f2", b"new")
+
+    assert not os.path.exists(old)
+    assert store.get(params("KI"), lambda: "f2") == new
+
+
+def test_top_counts_requests(tmp_path):
+    store = BriefingStore(str(tmp_path))
+    for _ in range(3):
+        store.record_request(params("KI"))
+    store.record_request(params("Sport"))
+
+    assert store.top(1) == [(params("KI"), 3)]
+    assert store.top(5) == [(params("KI"), 3), (params("Sport"), 1)]
+
+
+def test_scheduler_generates_top_and_prunes_the_rest(tmp_path):
+    store = BriefingStore(str(tmp_path))
+    generated = []
+
+    def generate(p):
+        generated.append(p)
+        return b"audio " + repr(p).encode()
+
+    scheduler = BriefingScheduler(store, generate, lambda p: "f1", top_n=1)
+    store.record_request(params("KI"))
+    scheduler.run_once()
+    kept = store.get(params("KI"), lambda: "f1")
+
+    # Unchanged fingerprint, nothing to regenerate
+    scheduler.run_once()
+    assert generated == [params("KI")]
+
+    for _ in range(2):
+        store.record_request(params("Sport"))
+    scheduler.run_once()
+
+    assert generated == [params("KI"), params("Sport")]
+    assert not os.path.exists(kept)
+    assert store.get(params("KI"), lambda: "f1") is None
+    assert store.get(params("Sport"), lambda: "f1") is not None
+    stats = store.stats()
+    assert stats["artifacts"] == 1 and stats["pruned"] == 1
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith(".mp3")) == \
+        [os.path.basename(store.get(params("Sport"), lambda: "f1"))]
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import feedparser
+import pytest
+
+from feed_cache import FeedCache
+
+
+def feed(*titles, status=200, etag=None, bozo=False):
+    return feedparser.FeedParserDict(
+        entries=[feedparser.FeedParserDict(title=title) for title in titles],
+        status=status,
+        etag=etag,
+        modified=None,
+        bozo=bozo,
+    )
+
+
+class FakeParse:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, url, **kwargs):
+        self.calls.append(kwargs)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def age(cache, url, seconds):
+    cache._entries[url].fetched_at -= seconds
+
+
+def titles(result):
+    return [entry.title for entry in result.entries]
+
+
+def test_fresh_entries_are_served_from_cache():
+    parse = FakeParse(feed("a", "b"))
+    cache = FeedCache(ttl=60, parse=parse)
+
+    assert titles(cache.get("u")) == ["a", "b"]
+    assert titles(cache.get("u")) == ["a", "b"]
+    assert len(parse.calls) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_stale_entry_is_served_while_refreshing():
+    parse = FakeParse(feed("a", etag="v1"), feed("b", etag="v2"))
+    cache = FeedCache(ttl=60, stale_ttl=600, parse=parse)
+    cache.get("u")
+    age(cache, "u", 120)
+
+    assert titles(cache.get("u")) == ["a"]
+    deadline = time.monotonic() + 5
+    while len(parse.calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert parse.calls[1] == {"etag": "v1"}
+    assert titles(cache.get("u")) == ["b"]
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_expired_entry_is_downloaded_again():
+    parse = FakeParse(feed("a"), feed("b"))
+    cache = FeedCache(ttl=60, stale_ttl=60, parse=parse)
+    cache.get("u")
+    age(cache, "u", 300)
+
+    assert titles(cache.get("u")) == ["b"]
+    assert cache.stats()["misses"] == 2
+
+
+def test_not_modified_keeps_entries():
+    parse = FakeParse(feed("a", etag="v1"), feed(status=304))
+    cache = FeedCache(ttl=60, parse=parse)
+    cache.get("u")
+    age(cache, "u", 120)
+
+    assert titles(cache.refresh("u")) == ["a"]
+    assert parse.calls[1] == {"etag": "v1"}
+    assert titles(cache.get("u")) == ["a"]
+    assert cache.stats()["not_modified"] == 1
+
+
+@pytest.mark.parametrize("failure", [feed(status=500), feed(bozo=True)])
+def test_failed_download_is_cached_only_for_negative_ttl(failure):
+    parse = FakeParse(failure, feed("a"))
+    cache = FeedCache(ttl=60, negative_ttl=30, parse=parse)
+
+    assert titles(cache.get("u")) == []
+    assert titles(cache.get("u")) == []
+    assert len(parse.calls) == 1
+    age(cache, "u", 31)
+    assert titles(cache.get("u")) == ["a"]
+    stats = cache.stats()
+    assert stats["negative_hits"] == 1 and stats["hits"] == 0 and stats["errors"] == 1
+
+
+def test_failed_download_keeps_previous_entries():
+    parse = FakeParse(feed("a"), feed(status=503))
+    cache = FeedCache(ttl=60, parse=parse)
+    cache.get("u")
+    age(cache, "u", 120)
+
+    assert titles(cache.refresh("u")) == ["a"]
+    assert not cache._entries["u"].failed
+
+
+def test_download_error_on_cold_miss_is_cached_for_negative_ttl():
+    parse = FakeParse(TimeoutError("timed out"), feed("a"))
+    cache = FeedCache(ttl=60, negative_ttl=30, parse=parse)
+
+    with pytest.raises(TimeoutError):
+        cache.get("u")
+    assert titles(cache.get("u")) == []
+    assert len(parse.calls) == 1
+    age(cache, "u", 31)
+    assert titles(cache.get("u")) == ["a"]
+
+
+def test_concurrent_requests_for_a_dead_feed_download_once():
+    release = threading.Event()
+
+    def parse(url, **kwargs):
+        parse.calls += 1
+        release.wait(5)
+        raise TimeoutError("timed out")
+
+    parse.calls = 0
+    cache = FeedCache(ttl=60, negative_ttl=30, parse=parse)
+    results = []
+
+    def get():
+        try:
+            results.append(titles(cache.get("u")))
+        except TimeoutError:
+            results.append("error")
+
+    threads = [threading.Thread(target=get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert parse.calls == 1
+    assert sorted(results, key=str) == [[], [], [], [], "error"]
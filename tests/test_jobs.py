@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobManager, JobQueueFull
+
+PARAMS = (("KI",), 3, 2)
+
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+
+def test_job_runs_to_done(tmp_path):
+    stages = []
+
+    def run(params, progress):
+        progress("summarizing", 0.5)
+        stages.append(params)
+        return b"audio"
+
+    manager = JobManager(run, str(tmp_path))
+    job, created = manager.submit("key", PARAMS)
+    wait_until_finished(job)
+
+    assert created
+    assert stages == [PARAMS]
+    assert job.stage == "done" and job.progress == 1.0
+    assert job.finished_at is not None
+    with open(job.audio_path, "rb") as fp:
+        assert fp.read() == b"audio"
+
+
+def test_failed_job(tmp_path):
+    def run(params, progress):
+        raise ValueError("kaputt")
+
+    manager = JobManager(run, str(tmp_path))
+    job, _ = manager.submit("key", PARAMS)
+    wait_until_finished(job)
+
+    assert job.stage == "failed"
+    assert job.error == "kaputt"
+    assert job.audio_path is None
+
+
+def test_late_progress_does_not_reopen_finished_job(tmp_path):
+    callbacks = []
+
+    def run(params, progress):
+        callbacks.append(progress)
+        return b"audio"
+
+    manager = JobManager(run, str(tmp_path), result_ttl=0)
+    job, _ = manager.submit("key", PARAMS)
+    wait_until_finished(job)
+    # e.g. a TTS segment that finishes after the job gave up waiting for it
+    callbacks[0]("synthesizing", 1.0)
+
+    assert job.stage == "done"
+    assert manager.get(job.id) is job
+    time.sleep(0.01)
+    manager._expire()
+    assert manager.get(job.id) is None
+
+
+def test_same_key_is_deduplicated_while_in_flight(tmp_path):
+    release = threading.Event()
+
+    def run(params, progress):
+        release.wait(5)
+        return b"audio"
+
+    manager = JobManager(run, str(tmp_path))
+    job, created = manager.submit("key", PARAMS)
+    same, created_again = manager.submit("key", PARAMS)
+    other, created_other = manager.submit("other", PARAMS)
+
+    assert created and not created_again and created_other
+    assert same is job and other is not job
+    release.set()
+    wait_until_finished(job)
+    wait_until_finished(other)
+
+    # Finished jobs are not reused
+    again, created = manager.submit("key", PARAMS)
+    assert created and again is not job
+    wait_until_finished(again)
+
+
+def test_full_queue_is_rejected(tmp_path):
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(params, progress):
+        started.set()
+        release.wait(5)
+        return b"audio"
+
+    manager = JobManager(run, str(tmp_path), workers=1, max_queue=1)
+    running, _ = manager.submit("running", PARAMS)
+    assert started.wait(5)
+    queued, _ = manager.submit("queued", PARAMS)
+
+    with pytest.raises(JobQueueFull):
+        manager.submit("rejected", PARAMS)
+    assert manager.stats()["queue_size"] == 1
+    release.set()
+    wait_until_finished(running)
+    wait_until_finished(queued)